@@ -33,8 +33,19 @@ CREATE TABLE matches (
 CREATE TABLE interviews (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     match_id INTEGER,
+    candidate_name TEXT,
+    email TEXT,
+    job_title TEXT,
     scheduled_date DATETIME,
     status TEXT DEFAULT 'pending',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (match_id) REFERENCES matches(id)
 );
+
+CREATE INDEX idx_interviews_slot ON interviews (scheduled_date, status);
+CREATE INDEX idx_interviews_status ON interviews (status, created_at);
+
+CREATE TABLE scheduler_state (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
@@ -6,6 +6,7 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@
 import { Progress } from "@/components/ui/progress";
 import { Mail, Phone, ChevronDown, ChevronUp, Send, Sparkles } from "lucide-react";
 import { cn } from "@/lib/utils";
+import { InterviewSlot } from "@/services/api";
 
 interface CandidateCardProps {
   candidate: Candidate;
@@ -22,13 +23,8 @@ const CandidateCard = ({ candidate, onSendEmail }: CandidateCardProps) => {
     }
   };
 
-  const interviewSlots = candidate.interview_options.dates.flatMap((date) =>
-    candidate.interview_options.times.map((time) => ({
-      value: `${date} ${time}`,
-      date,
-      time,
-    }))
-  );
+  // Only the slots the scheduler allocated to this candidate
+  const interviewSlots: InterviewSlot[] = candidate.interview_options.slots ?? [];
 
   return (
     <Card className="group relative overflow-hidden bg-white/70 backdrop-blur-sm border border-slate-200/60 hover:bg-white/80 transition-all duration-300 hover:shadow-lg">
@@ -116,7 +112,7 @@ const CandidateCard = ({ candidate, onSendEmail }: CandidateCardProps) => {
                 {interviewSlots.map((slot, index) => (
                   <SelectItem 
                     key={index} 
-                    value={slot.value}
+                    value={slot.start}
                     className="hover:bg-gradient-to-r hover:from-blue-50 hover:to-purple-50 transition-colors duration-150 focus:bg-gradient-to-r focus:from-blue-50 focus:to-purple-50"
                   >
                     {`${slot.date} - ${slot.time}`}
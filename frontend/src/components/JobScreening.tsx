@@ -187,18 +187,13 @@ export const JobScreening: React.FC = () => {
               </div>
               <div className="mt-4">
                 <h4 className="font-medium mb-2">Interview Options</h4>
-                <div className="space-y-2">
-                  {candidate.interview_options.dates.map((date, index) => (
-                    <div key={index} className="text-sm">
-                      <p className="font-medium">{date}</p>
-                      <ul className="list-disc list-inside">
-                        {candidate.interview_options.times.map((time, timeIndex) => (
-                          <li key={timeIndex}>{time}</li>
-                        ))}
-                      </ul>
-                    </div>
+                <ul className="space-y-1 list-disc list-inside text-sm">
+                  {(candidate.interview_options.slots ?? []).map((slot) => (
+                    <li key={slot.start}>
+                      <span className="font-medium">{slot.date}</span> - {slot.time}
+                    </li>
                   ))}
-                </div>
+                </ul>
               </div>
               <Button
                 className="w-full mt-4"
@@ -208,10 +203,10 @@ export const JobScreening: React.FC = () => {
                     candidateName: candidate.name,
                     candidateEmail: candidate.email,
                     jobTitle: selectedJob,
-                    interviewTime: candidate.interview_options.times[0],
+                    interviewTime: candidate.interview_options.slots?.[0]?.start,
                   })
                 }
-                disabled={candidate.email === 'Not found'}
+                disabled={candidate.email === 'Not found' || !candidate.interview_options.slots?.length}
               >
                 Send Interview Invitation
               </Button>
@@ -10,6 +10,14 @@ const api = axios.create({
   },
 });
 
+// A slot allocated by the backend scheduler; start identifies it when reserving
+export interface InterviewSlot {
+  date: string;
+  time: string;
+  start: string;
+  interview_id?: number;
+}
+
 export interface Job {
   title: string;
   description: string;
@@ -43,7 +51,10 @@ export const fetchJobDescription = async (jobTitle: string): Promise<JobDescript
 
 export const fetchCandidates = async (jobTitle: string): Promise<Candidate[]> => {
   try {
-    const response = await api.get(`/candidates/${encodeURIComponent(jobTitle)}`);
+    // The compact schema drops match_score/matched_keywords, which repeat score/keywords
+    const response = await api.get(`/candidates/${encodeURIComponent(jobTitle)}`, {
+      params: { compact: 1 },
+    });
     // Handle the new response format which includes candidates and message
     if (response.data && response.data.candidates) {
       // If there's a message, show it as a toast
@@ -62,12 +73,12 @@ export const fetchCandidates = async (jobTitle: string): Promise<Candidate[]> =>
 
 export const sendInterviewEmail = async (emailData: EmailData): Promise<void> => {
   try {
+    // interviewTime carries the start of the slot picked from interview_options.slots
     await api.post('/send-interview-email', {
       candidate_name: emailData.candidateName,
       email: emailData.candidateEmail,
       job_title: emailData.jobTitle,
-      dates: [new Date().toISOString().split('T')[0]], // Default to today
-      times: [emailData.interviewTime]
+      start: emailData.interviewTime
     });
   } catch (error) {
     console.error("Error sending interview email:", error);
@@ -92,7 +103,7 @@ export const apiService = {
   // Get candidates for a job title
   getCandidates: async (jobTitle: string, threshold = 80, boost = 2.5): Promise<Candidate[]> => {
     const response = await api.get(`/candidates/${encodeURIComponent(jobTitle)}`, {
-      params: { threshold, boost },
+      params: { threshold, boost, compact: 1 },
     });
     return response.data;
   },
@@ -102,9 +113,8 @@ export const apiService = {
     candidate_name: string;
     email: string;
     job_title: string;
-    dates: string[];
-    times: string[];
-  }): Promise<{ success: boolean }> => {
+    start?: string;
+  }): Promise<{ success: boolean; slots: InterviewSlot[] }> => {
     const response = await api.post('/send-interview-email', data);
     return response.data;
   },
@@ -5,14 +5,25 @@ import os
 import pandas as pd
 import PyPDF2
 import re
-import datetime
-import random
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
 import traceback
 import logging
+from utils.text import extract_keywords
+from utils.scheduler import (
+    init_interviews_table, allocate_interview_slots, reserve_interview_slot, confirm_interview_slot,
+    release_interview_slots, interview_generation, SlotCapacityError
+)
+from utils.screening_index import (
+    init_screening_tables, sync_resume_index, ensure_job_indexed, update_job_skills, get_matches,
+    corpus_version
+)
+from utils.http_cache import (
+    init_http_cache, make_etag, not_modified, cached_json, wants_compact, compact_candidate
+)
+from utils.sharding import ShardCoordinator, init_shard_assignments, rebalance_shards
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,6 +33,8 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__, static_folder='frontend/build', static_url_path='')
 # Configure CORS to allow requests from the frontend
 CORS(app, resources={r"/api/*": {"origins": ["http://localhost:6969", "http://127.0.0.1:6969"]}})
+# Compress JSON responses for clients that accept gzip/brotli
+init_http_cache(app)
 
 # Load environment variables
 try:
@@ -56,6 +69,10 @@ COMPANY_NAME = os.getenv('COMPANY_NAME', 'Our Company')
 job_file_path = './job_description.csv'
 resume_directory_path = './CVs1'
 
+# Scale-out mode: comma-separated URLs of shard workers (python -m utils.sharding worker)
+SHARD_URLS = [url for url in os.getenv('SHARD_URLS', '').split(',') if url.strip()]
+shard_coordinator = ShardCoordinator.from_urls(SHARD_URLS) if SHARD_URLS else None
+
 # Initialize SQLite database
 def init_db():
     conn = sqlite3.connect('job_screening.db')
@@ -80,13 +97,22 @@ def init_db():
     )
     ''')
     
+    init_interviews_table(cursor)
+    init_screening_tables(cursor)
+    init_shard_assignments(cursor)
+    
     conn.commit()
     conn.close()
 
 # Initialize database on startup
 init_db()
 
-# Dictionary mapping job titles to their required key skills
+# Assign and rebalance resumes once at startup; the copies reach the shards in the background
+if shard_coordinator:
+    rebalance_shards('job_screening.db', shard_coordinator)
+    shard_coordinator.schedule_flush('job_screening.db')
+
+# Default key skills per job title, seeded into job_skill_versions on first use
 job_skills = {
     "Software Engineer": [
         "Python", "Java", "C++", "JavaScript", "SQL", "Git", "Data Structures", "Algorithms",
@@ -245,17 +271,6 @@ job_skills = {
     ]
 }
 
-# Function to extract keywords from text
-def extract_keywords(text):
-    # Convert text to lowercase
-    text = text.lower()
-    # Remove punctuation and special characters
-    text = re.sub(r'[^\w\s]', ' ', text)
-    # Split into words
-    words = text.split()
-    # Remove duplicates and join with commas
-    return ', '.join(set(words))
-
 # Function to extract text from PDF
 def extract_text_from_pdf(pdf_path):
     text = ""
@@ -308,73 +323,9 @@ def extract_contact_info(text):
     
     return name, email.group(0) if email else "Not found", phone.group(0) if phone else "Not found"
 
-# Function to remove common stopwords from keywords
-def filter_keywords(keywords):
-    # Comprehensive stopwords list including common job description terms
-    stopwords = set([
-        # General stopwords
-        'and', 'or', 'the', 'a', 'an', 'in', 'to', 'with', 'for', 'on', 'by', 'of', 'at', 
-        'from', 'as', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had',
-        'do', 'does', 'did', 'but', 'if', 'because', 'so', 'while', 'although', 'yet', 'since',
-        'about', 'above', 'below', 'over', 'under', 'again', 'further', 'then', 'once', 'here',
-        'there', 'when', 'where', 'why', 'how', 'all', 'any', 'each', 'few', 'more',
-        'most', 'other', 'some', 'such', 'no', 'not', 'only', 'own', 'same', 'than', 'too',
-        'very', 's', 't', 'can', 'will', 'just', 'don', 'should', 'now',
-        
-        # Job description specific stopwords
-        'we', 'are', 'looking', 'seeking', 'ideal', 'candidate', 'will', 'must', 'should',
-        'required', 'requirements', 'job', 'position', 'company', 'working', 'based',
-        'like', 'good', 'great', 'years',
-        'excellent', 'very', 'such', 'just', 'also', 'our', 'your', 'their', 'this', 'that',
-        
-        # Additional common words in job descriptions
-        'ability', 'work', 'team', 'skills', 'experience', 'knowledge', 'environment',
-        'development', 'design', 'implementation', 'management', 'communication',
-        'problem', 'solving', 'solutions', 'quality', 'time', 'project', 'projects',
-        'responsibilities', 'qualifications', 'education', 'degree', 'bachelor',
-        'master', 'phd', 'certification', 'proficiency', 'proficient', 'familiar',
-        'understanding', 'strong', 'minimum', 'preferred', 'plus', 'bonus', 'benefits'
-    ])
-    
-    # Ensure keywords is a list before processing
-    if isinstance(keywords, str):
-        keywords = keywords.split(', ')
-    
-    # Filter out stopwords and ensure words meet minimum length
-    filtered = []
-    for word in keywords:
-        word = word.strip().lower()
-        if (word not in stopwords and
-            len(word) > 2 and  # Avoid very short terms
-            not word.isdigit() and  # Remove pure numbers
-            not any(char.isdigit() for char in word)):  # Remove terms with numbers
-            filtered.append(word)
-    
-    return filtered
-
-# Function to generate interview information (without email functionality)
-def generate_interview_options(candidate_name, job_title):
-    # Generate interview dates (next 7-14 days)
-    today = datetime.datetime.now()
-    interview_dates = []
-    for i in range(7, 15):
-        interview_date = today + datetime.timedelta(days=i)
-        if interview_date.weekday() < 5:  # Only weekdays
-            interview_dates.append(interview_date.strftime("%A, %B %d, %Y"))
-    
-    # Select 2 random dates
-    selected_dates = random.sample(interview_dates, min(2, len(interview_dates)))
-    
-    # Generate interview times
-    interview_times = ["10:00 AM", "11:30 AM", "2:00 PM", "3:30 PM"]
-    selected_times = random.sample(interview_times, min(2, len(interview_times)))
-    
-    return {
-        "candidate_name": candidate_name,
-        "job_title": job_title,
-        "dates": selected_dates,
-        "times": selected_times
-    }
+# Function to compute a candidate's match score from the number of matched keywords
+def calculate_match_score(matched_count, total_keywords, boost_factor):
+    return int(min(100, (matched_count / total_keywords) * 100 * boost_factor))
 
 def get_role_specific_content(job_title):
     """Generate role-specific email content"""
@@ -461,7 +412,7 @@ The interview will cover your design process, user research methodologies, and i
 We are impressed with your qualifications and would like to discuss your experience in more detail.
 The interview will help us better understand your skills and how they align with our requirements.""")
 
-def send_interview_email(candidate_name, email, job_title, dates, times):
+def send_interview_email(candidate_name, email, job_title, dates, times, slots=None):
     """Send interview invitation email to candidate"""
     if not all([GMAIL_USER, GMAIL_APP_PASSWORD]):
         logger.warning("Email credentials not found in .env file")
@@ -485,11 +436,19 @@ Thank you for applying for the {job_title} position at {COMPANY_NAME}. We are pl
 We would like to schedule an interview at your convenience. Here are the available slots:
 
 """
+        # Group allocated slots by date, or offer every time on every date
+        if slots:
+            times_by_date = {}
+            for slot in slots:
+                times_by_date.setdefault(slot['date'], []).append(slot['time'])
+        else:
+            times_by_date = {date: times for date in dates}
+        
         # Add formatted dates and times
-        for date in dates:
+        for date, date_times in times_by_date.items():
             body += f"\nDate: {date}"
             body += "\nAvailable times:"
-            for time in times:
+            for time in date_times:
                 body += f"\n- {time}"
             body += "\n"
         
@@ -533,7 +492,9 @@ def get_jobs():
     cursor.execute("SELECT title FROM job_descriptions")
     jobs = [row[0] for row in cursor.fetchall()]
     conn.close()
-    return jsonify(jobs)
+    
+    etag = make_etag('jobs', jobs)
+    return not_modified(etag) or cached_json(jobs, etag)
 
 @app.route('/api/job/<title>', methods=['GET'])
 def get_job_details(title):
@@ -541,25 +502,60 @@ def get_job_details(title):
     cursor = conn.cursor()
     cursor.execute('SELECT description FROM job_descriptions WHERE title = ?', (title,))
     result = cursor.fetchone()
-    conn.close()
     
     if result:
         description = result[0]
-        # Use predefined skills for the job title, or empty list if title not found
-        skills = job_skills.get(title, [])
-        return jsonify({
+        # Use the current skill version, seeded from the predefined skills on first use
+        version, skills, _ = ensure_job_indexed(conn, title, job_skills.get(title, []))
+        conn.close()
+        
+        etag = make_etag('job', title, version, description)
+        return not_modified(etag) or cached_json({
             'title': title,
             'description': description,
-            'keywords': skills
-        })
+            'keywords': skills,
+            'version': version
+        }, etag)
+    conn.close()
     return jsonify({'error': 'Job not found'}), 404
 
+@app.route('/api/job/<title>', methods=['PUT'])
+def update_job(title):
+    data = request.json or {}
+    skills = data.get('skills')
+    description = data.get('description')
+    
+    if skills is None and description is None:
+        return jsonify({'error': 'Provide skills and/or description'}), 400
+    if skills is not None and not (isinstance(skills, list) and all(isinstance(s, str) for s in skills)):
+        return jsonify({'error': 'skills must be a list of strings'}), 400
+    if description is not None and not isinstance(description, str):
+        return jsonify({'error': 'description must be a string'}), 400
+    
+    conn = sqlite3.connect('job_screening.db', timeout=30)
+    # Only resumes containing added or removed terms are rescored; omitted skills keep the current list
+    change = update_job_skills(
+        conn, title, skills=skills, description=description, default_skills=job_skills.get(title, [])
+    )
+    conn.close()
+    
+    if change is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify({
+        'success': True,
+        'title': title,
+        'version': change['version'],
+        'added_terms': change['added'],
+        'removed_terms': change['removed']
+    })
+
 @app.route('/api/candidates/<job_title>', methods=['GET'])
 def get_candidates(job_title):
     threshold_score = int(request.args.get('threshold', 70))  # Default threshold changed to 70%
     boost_factor = float(request.args.get('boost', 2.5))
     
-    conn = sqlite3.connect('job_screening.db')
+    conn = sqlite3.connect('job_screening.db', timeout=30)
     cursor = conn.cursor()
     
     # Get job keywords
@@ -570,24 +566,55 @@ def get_candidates(job_title):
         conn.close()
         return jsonify({'error': 'Job not found'}), 404
     
-    job_keywords = job_result[0].split(', ')
-    job_keywords = filter_keywords(job_keywords)  # Filter job keywords
-    
-    # Get candidates
-    cursor.execute('SELECT cv_number, keywords, content FROM resumes')
-    candidates = cursor.fetchall()
+    job_version, _, job_keywords = ensure_job_indexed(conn, job_title, job_skills.get(job_title, []))
+    compact = wants_compact()
+    
+    shard_pending = None
+    if shard_coordinator:
+        # Record shards for new resumes; pending copies are pushed in the background
+        shard_coordinator.ingest(conn)
+        shard_pending = shard_coordinator.pending_count(conn)
+        if shard_pending:
+            shard_coordinator.schedule_flush('job_screening.db')
+    
+    # The result only changes with the job version, the resume corpus, the shard copies or the interview bookings
+    etag = make_etag(
+        'candidates', job_title, job_version, corpus_version(conn), shard_pending,
+        interview_generation(conn), threshold_score, boost_factor, compact
+    )
+    cached = not_modified(etag)
+    if cached:
+        conn.close()
+        return cached
+    
+    if shard_coordinator:
+        # Fewest matched keywords that still reach the threshold
+        min_count = next(
+            (n for n in range(1, len(job_keywords) + 1)
+             if calculate_match_score(n, len(job_keywords), boost_factor) >= threshold_score),
+            len(job_keywords) + 1
+        )
+        # Merge every shard's matches above the threshold (or top 5)
+        try:
+            matches = [
+                (m['resume_id'], m['cv_number'], m['content'], m['terms'])
+                for m in shard_coordinator.search(job_keywords, min_count, 5)
+            ]
+        except OSError as e:
+            conn.close()
+            logger.error(f"Shard search failed: {str(e)}")
+            return jsonify({'error': 'Candidate shards are unavailable, please retry'}), 503
+    else:
+        # Index any new resumes, then read the stored matches
+        sync_resume_index(conn)
+        matches = get_matches(conn, job_title)
     
     # Match candidates
     matched_candidates = []
-    for cv_number, candidate_keywords, content in candidates:
-        candidate_keywords = candidate_keywords.split(', ')
-        candidate_keywords = filter_keywords(candidate_keywords)  # Filter candidate keywords
-        common_keywords = set(job_keywords) & set(candidate_keywords)
-        
+    for _, cv_number, content, common_keywords in matches:
         if len(common_keywords) > 0:
-            match_score = int(min(100, (len(common_keywords) / len(job_keywords)) * 100 * boost_factor))
+            match_score = calculate_match_score(len(common_keywords), len(job_keywords), boost_factor)
             name, email, phone = extract_contact_info(content)
-            interview_options = generate_interview_options(name, job_title)
             
             candidate_info = {
                 'cv_number': cv_number,
@@ -597,8 +624,7 @@ def get_candidates(job_title):
                 'score': match_score,
                 'match_score': match_score,  # Add explicit match_score field
                 'keywords': list(common_keywords),
-                'matched_keywords': list(common_keywords),
-                'interview_options': interview_options
+                'matched_keywords': list(common_keywords)
             }
             matched_candidates.append(candidate_info)
     
@@ -621,20 +647,56 @@ def get_candidates(job_title):
         response['candidates'] = top_5_candidates
         response['message'] = f"No candidates passed the {threshold_score}% threshold. Returning the top {len(top_5_candidates)} candidates."
     
+    # Preview distinct interview slots across the returned candidates (nothing is reserved)
+    interview_options = allocate_interview_slots('job_screening.db', response['candidates'], job_title, reserve=False)
+    for candidate_info, options in zip(response['candidates'], interview_options):
+        candidate_info['interview_options'] = options
+    
+    if compact:
+        response['candidates'] = [compact_candidate(c) for c in response['candidates']]
+    
     conn.close()
-    return jsonify(response)
+    return cached_json(response, etag)
 
 @app.route('/api/send-interview-email', methods=['POST'])
 def send_interview_email_route():
     data = request.json
+    candidate = {'name': data['candidate_name'], 'email': data['email']}
+    
+    # Reserve the slot picked from the preview, or allocate a fresh one
+    try:
+        if data.get('start'):
+            interview_options = reserve_interview_slot(
+                'job_screening.db', candidate['name'], candidate['email'], data['job_title'], data['start']
+            )
+        else:
+            interview_options = allocate_interview_slots('job_screening.db', [candidate], data['job_title'])[0]
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except SlotCapacityError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    
     success = send_interview_email(
-        data['candidate_name'],
-        data['email'],
+        candidate['name'],
+        candidate['email'],
         data['job_title'],
-        data['dates'],
-        data['times']
+        interview_options['dates'],
+        interview_options['times'],
+        slots=interview_options['slots']
     )
-    return jsonify({'success': success})
+    
+    # Free the slot again if the invitation never went out
+    if not success:
+        release_interview_slots('job_screening.db', [slot['interview_id'] for slot in interview_options['slots']])
+    
+    return jsonify({'success': success, 'slots': interview_options['slots'] if success else []})
+
+@app.route('/api/interviews/<int:interview_id>/confirm', methods=['POST'])
+def confirm_interview(interview_id):
+    # Confirming one offered slot releases the candidate's other offers
+    if confirm_interview_slot('job_screening.db', interview_id):
+        return jsonify({'success': True})
+    return jsonify({'success': False, 'error': 'Interview offer not found or expired'}), 409
 
 @app.route('/api/send-bulk-interview-emails', methods=['POST'])
 def send_bulk_interview_emails():
@@ -642,24 +704,35 @@ def send_bulk_interview_emails():
     candidates = data.get('candidates', [])
     job_title = data.get('job_title')
     
+    # Reserve distinct interview slots for the whole batch in one transaction
+    try:
+        all_options = allocate_interview_slots('job_screening.db', candidates, job_title)
+    except SlotCapacityError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    
     results = []
-    for candidate in candidates:
-        # Generate unique interview options for each candidate
-        interview_options = generate_interview_options(candidate['name'], job_title)
+    for candidate, interview_options in zip(candidates, all_options):
+        interview_ids = [slot['interview_id'] for slot in interview_options['slots']]
         
-        # Send email with the generated options
+        # Send email with the allocated slots
         success = send_interview_email(
             candidate['name'],
             candidate['email'],
             job_title,
             interview_options['dates'],
-            interview_options['times']
+            interview_options['times'],
+            slots=interview_options['slots']
         )
         
+        # Free the slots again if the invitation never went out
+        if not success:
+            release_interview_slots('job_screening.db', interview_ids)
+        
         results.append({
             'candidate_name': candidate['name'],
             'email': candidate['email'],
-            'success': success
+            'success': success,
+            'slots': interview_options['slots'] if success else []
         })
     
     # Return summary of email sending results
@@ -693,13 +766,20 @@ def upload_resume():
         name = extract_candidate_name(content)
         
         # Store in database
-        conn = sqlite3.connect('job_screening.db')
+        conn = sqlite3.connect('job_screening.db', timeout=30)
         cursor = conn.cursor()
         cursor.execute(
             'INSERT INTO resumes (name, cv_number, keywords, content) VALUES (?, ?, ?, ?)',
             (name, file.filename.split('.')[0], keywords, content)
         )
         conn.commit()
+        
+        # Add the resume's terms to the postings and existing job scores, or to a shard
+        if shard_coordinator:
+            shard_coordinator.ingest(conn)
+            shard_coordinator.schedule_flush('job_screening.db')
+        else:
+            sync_resume_index(conn)
         conn.close()
         
         # Clean up
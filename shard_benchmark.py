@@ -0,0 +1,212 @@
+"""
+Throughput benchmark for sharded screening.
+
+Builds a synthetic resume corpus, starts 1, 2, 4 and 8 local shard workers
+in turn, checks the coordinator returns the same matches as the single-node
+index and reports screening queries per second for each shard count.
+
+    python shard_benchmark.py --resumes 20000 --queries 200 --concurrency 8
+"""
+import argparse
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.text import extract_keywords
+from utils.screening_index import init_screening_tables, sync_resume_index, ensure_job_indexed, get_matches
+from utils.sharding import ShardCoordinator, HttpShard, init_shard_assignments, select_matches
+
+SKILLS = [
+    "Python", "Java", "SQL", "Docker", "Kubernetes", "Terraform", "Ansible", "Jenkins",
+    "Linux", "Spark", "Kafka", "Hadoop", "React", "Node", "TypeScript", "Tableau",
+    "Figma", "Selenium", "Golang", "Rust", "Scala", "Azure", "AWS", "Pandas",
+    "NumPy", "TensorFlow", "PyTorch", "Airflow", "Snowflake", "GraphQL", "Redis", "MongoDB"
+]
+FILLER = ["delivered", "migrated", "platform", "pipelines", "customers", "reporting", "latency",
+          "mentored", "roadmap", "stakeholders", "automated", "deployed", "monitoring", "scaled"]
+
+
+def build_corpus(db_path, num_resumes, num_jobs, seed):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute('CREATE TABLE resumes (id INTEGER PRIMARY KEY, name TEXT, cv_number TEXT, keywords TEXT, content TEXT)')
+    cursor.execute('CREATE TABLE job_descriptions (id INTEGER PRIMARY KEY, title TEXT, description TEXT, keywords TEXT)')
+    init_screening_tables(cursor)
+    init_shard_assignments(cursor)
+
+    rows = []
+    for i in range(num_resumes):
+        words = rng.sample(SKILLS, rng.randint(3, 12)) + rng.sample(FILLER, 6)
+        content = f"Candidate {i}\ncandidate{i}@example.com\n" + ' '.join(words)
+        rows.append((f"Candidate {i}", f"C{i}", extract_keywords(content), content))
+    cursor.executemany('INSERT INTO resumes (name, cv_number, keywords, content) VALUES (?, ?, ?, ?)', rows)
+
+    jobs = {}
+    for j in range(num_jobs):
+        title = f"Job {j}"
+        description = ' '.join(rng.sample(FILLER, 3))
+        cursor.execute(
+            'INSERT INTO job_descriptions (title, description, keywords) VALUES (?, ?, ?)',
+            (title, description, extract_keywords(description))
+        )
+        jobs[title] = rng.sample(SKILLS, 24)
+    conn.commit()
+
+    sync_resume_index(conn)
+    job_terms = {}
+    for title, skills in jobs.items():
+        job_terms[title] = ensure_job_indexed(conn, title, skills)[2]
+    conn.close()
+    return job_terms
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_workers(num_shards, work_dir):
+    processes, urls = [], []
+    for n in range(num_shards):
+        port = free_port()
+        db = os.path.join(work_dir, f"shard{num_shards}_{n}.db")
+        processes.append(subprocess.Popen(
+            [sys.executable, '-m', 'utils.sharding', 'worker', '--db', db, '--port', str(port)],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        ))
+        urls.append(f"http://127.0.0.1:{port}")
+
+    # Wait until every worker answers
+    deadline = time.time() + 30
+    for url in urls:
+        while True:
+            try:
+                urllib.request.urlopen(url + '/shard/stats', timeout=1)
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise RuntimeError(f"Shard worker at {url} did not start")
+                time.sleep(0.1)
+    return processes, urls
+
+
+def min_count_for(threshold, total, boost):
+    for n in range(1, total + 1):
+        if int(min(100, (n / total) * 100 * boost)) >= threshold:
+            return n
+    return total + 1
+
+
+def comparable(matches):
+    return [(m['resume_id'], m['count'], sorted(m['terms'])) for m in matches]
+
+
+def single_node_matches(db_path, title, min_count, k):
+    conn = sqlite3.connect(db_path)
+    matches = [
+        {'resume_id': resume_id, 'count': len(terms), 'terms': terms}
+        for resume_id, _, _, terms in get_matches(conn, title)
+    ]
+    conn.close()
+    return select_matches(matches, min_count, k)
+
+
+def check_matches(db_path, coordinator, job_terms, threshold, boost, label):
+    # The coordinator must return exactly what the single-node index returns
+    for title in job_terms:
+        for t in (0, threshold, 101):
+            needed = min_count_for(t, len(job_terms[title]), boost)
+            expected = comparable(single_node_matches(db_path, title, needed, 5))
+            actual = comparable(coordinator.search(job_terms[title], needed, 5))
+            if expected != actual:
+                raise AssertionError(f"{label} disagrees with single node for {title}")
+
+
+def run_queries(search, job_terms, num_queries, concurrency, seed):
+    rng = random.Random(seed)
+    titles = [rng.choice(list(job_terms)) for _ in range(num_queries)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(search, titles))
+    return num_queries / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sharded screening throughput')
+    parser.add_argument('--resumes', type=int, default=20000)
+    parser.add_argument('--jobs', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--shards', default='1,2,4,8')
+    parser.add_argument('--threshold', type=int, default=70)
+    parser.add_argument('--boost', type=float, default=2.5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, 'job_screening.db')
+        print(f"Building corpus of {args.resumes} resumes ...")
+        job_terms = build_corpus(db_path, args.resumes, args.jobs, args.seed)
+
+        def min_count(title):
+            return min_count_for(args.threshold, len(job_terms[title]), args.boost)
+
+        qps = run_queries(
+            lambda title: single_node_matches(db_path, title, min_count(title), 5),
+            job_terms, args.queries, args.concurrency, args.seed
+        )
+        print(f"single node (in-process): {qps:8.1f} queries/s")
+
+        for num_shards in [int(n) for n in args.shards.split(',')]:
+            processes, urls = start_workers(num_shards, work_dir)
+            try:
+                coordinator = ShardCoordinator(HttpShard(url) for url in urls)
+                conn = sqlite3.connect(db_path)
+                conn.execute('DELETE FROM resume_shards')
+                conn.execute('DELETE FROM shard_nodes')
+                conn.commit()
+                start = time.perf_counter()
+                coordinator.ingest(conn)
+                conn.close()
+                coordinator.flush_pending(db_path)
+                ingest_time = time.perf_counter() - start
+
+                check_matches(db_path, coordinator, job_terms, args.threshold, args.boost, f"{num_shards} shards")
+
+                sizes = [shard.stats()['resumes'] for shard in coordinator.shards]
+                qps = run_queries(
+                    lambda title: coordinator.search(job_terms[title], min_count(title), 5),
+                    job_terms, args.queries, args.concurrency, args.seed
+                )
+                print(f"{num_shards} shard(s): {qps:8.1f} queries/s  "
+                      f"(ingest {ingest_time:.1f}s, shard sizes {sizes}, results match single node)")
+
+                if num_shards > 1:
+                    # Drop the first shard and reverse the rest, so every remaining shard changes position
+                    remaining = urls[1:][::-1]
+                    coordinator = ShardCoordinator(HttpShard(url) for url in remaining)
+                    conn = sqlite3.connect(db_path)
+                    moved = coordinator.rebalance(conn)
+                    conn.close()
+                    coordinator.flush_pending(db_path)
+                    check_matches(db_path, coordinator, job_terms, args.threshold, args.boost,
+                                  f"{num_shards} shards less one")
+                    print(f"  removed and reordered a shard: moved {moved} resumes, results match single node")
+            finally:
+                for process in processes:
+                    process.terminate()
+                    process.wait()
+
+
+if __name__ == '__main__':
+    main()
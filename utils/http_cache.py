@@ -0,0 +1,122 @@
+"""
+Conditional and compressed JSON responses for the API.
+
+Routes build a strong ETag from the versions their payload depends on and
+call not_modified() before doing any real work, so a polling client that
+already holds the current representation costs one cheap lookup and an
+empty 304. Larger JSON bodies are gzip or brotli encoded on the way out.
+"""
+import gzip
+import hashlib
+import json
+
+from flask import Response, jsonify, request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 500
+# Let clients keep the body but revalidate it on every use
+CACHE_CONTROL = 'no-cache'
+
+# Fields repeated under a second name in the full candidate schema
+DUPLICATE_CANDIDATE_FIELDS = ('match_score', 'matched_keywords')
+# interview_options fields the compact schema keeps; dates and times are
+# derived from the slots, and candidate_name and job_title repeat the request
+COMPACT_INTERVIEW_FIELDS = ('slots',)
+
+
+def make_etag(*parts):
+    """Return a strong ETag value for the given version components"""
+    key = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def wants_compact():
+    """True when the client asked for the compact response schema"""
+    return request.args.get('compact', '').lower() in ('1', 'true', 'yes')
+
+
+def compact_candidate(candidate):
+    """Drop the fields that only duplicate other fields or the request"""
+    compact = {k: v for k, v in candidate.items() if k not in DUPLICATE_CANDIDATE_FIELDS}
+    if 'interview_options' in compact:
+        compact['interview_options'] = {
+            k: v for k, v in compact['interview_options'].items() if k in COMPACT_INTERVIEW_FIELDS
+        }
+    return compact
+
+
+def _etag_matches(etag):
+    if_none_match = request.if_none_match
+    if if_none_match.star_tag:
+        return True
+    # Compressed representations carry an encoding suffix on the same base tag
+    return any(tag.split('-')[0] == etag for tag in if_none_match.as_set(include_weak=True))
+
+
+def not_modified(etag):
+    """Return a 304 response if the client already has this ETag, else None"""
+    if not _etag_matches(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def cached_json(payload, etag):
+    """jsonify the payload and attach its ETag and caching headers"""
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def _pick_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress_response(response):
+    """after_request hook: gzip or brotli encode JSON bodies the client accepts"""
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype != 'application/json'):
+        return response
+
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return response
+
+    encoding = _pick_encoding()
+    response.vary.add('Accept-Encoding')
+    if encoding is None:
+        return response
+
+    if encoding == 'br':
+        response.set_data(brotli.compress(data, quality=5))
+    else:
+        response.set_data(gzip.compress(data, compresslevel=6))
+    response.headers['Content-Encoding'] = encoding
+
+    # A strong ETag must differ between encodings of the same payload
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
+    return response
+
+
+def init_http_cache(app):
+    """Register response compression on the Flask app"""
+    app.after_request(compress_response)
@@ -0,0 +1,415 @@
+"""
+Interview slot scheduler backed by the interviews table.
+
+Slots are fixed-length intervals on weekdays. Every confirmed interview,
+and every offer younger than OFFER_TTL, counts against the capacity of the
+slot its scheduled_date falls into. A batch of candidates is spread across
+distinct slots, and no slot is ever handed out more often than its capacity
+allows. Confirming one offered slot releases the candidate's other offers.
+"""
+import datetime
+import heapq
+import os
+import sqlite3
+import threading
+from bisect import bisect_right
+
+# Daily interview start times, kept in the same format the emails use
+INTERVIEW_TIMES = [
+    t.strip() for t in os.getenv('INTERVIEW_TIMES', '10:00 AM,11:30 AM,2:00 PM,3:30 PM').split(',') if t.strip()
+]
+SLOT_DURATION = datetime.timedelta(minutes=int(os.getenv('INTERVIEW_SLOT_MINUTES', 60)))
+
+# How many interviews may share one slot (parallel interview panels)
+SLOT_CAPACITY = int(os.getenv('INTERVIEW_SLOT_CAPACITY', 1))
+# Number of slots offered to each candidate
+SLOTS_PER_CANDIDATE = int(os.getenv('INTERVIEW_SLOTS_PER_CANDIDATE', 2))
+# Interviews start a week out; the window grows a week at a time when full
+FIRST_DAY_OFFSET = 7
+WINDOW_DAYS = 8
+MAX_WINDOW_DAYS = int(os.getenv('INTERVIEW_MAX_WINDOW_DAYS', 90))
+# Offers nobody confirmed within this time stop holding their slot
+OFFER_TTL = datetime.timedelta(hours=int(os.getenv('INTERVIEW_OFFER_TTL_HOURS', 72)))
+
+DATE_FORMAT = "%A, %B %d, %Y"
+DB_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Serializes reservations within this process; BEGIN IMMEDIATE covers other processes
+_allocation_lock = threading.Lock()
+
+
+class SlotCapacityError(Exception):
+    """Raised when there are not enough free slots for a reservation"""
+
+
+def init_interviews_table(cursor):
+    """Create the interviews table and its slot lookup index"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS interviews (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        match_id INTEGER,
+        candidate_name TEXT,
+        email TEXT,
+        job_title TEXT,
+        scheduled_date DATETIME,
+        status TEXT DEFAULT 'pending',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_interviews_slot
+    ON interviews (scheduled_date, status)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_interviews_status
+    ON interviews (status, created_at)
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS scheduler_state (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    )
+    ''')
+
+
+def _bump_generation(cursor):
+    # Every write that can change slot availability bumps this counter
+    cursor.execute(
+        "INSERT INTO scheduler_state (name, value) VALUES ('interviews', 1) "
+        "ON CONFLICT (name) DO UPDATE SET value = value + 1"
+    )
+
+
+def _offer_cutoff():
+    # created_at defaults to CURRENT_TIMESTAMP, which SQLite stores in UTC
+    return (datetime.datetime.utcnow() - OFFER_TTL).strftime(DB_DATETIME_FORMAT)
+
+
+def _expire_stale_offers(cursor):
+    cursor.execute(
+        "UPDATE interviews SET status = 'expired' WHERE status = 'offered' AND created_at < ?",
+        (_offer_cutoff(),)
+    )
+
+
+def _parse_time(time_label):
+    return datetime.datetime.strptime(time_label, "%I:%M %p").time()
+
+
+def build_slot_grid(start_day, num_days):
+    """Return the sorted start datetimes of all weekday slots in the window"""
+    times = [_parse_time(label) for label in INTERVIEW_TIMES]
+    starts = []
+    for i in range(num_days):
+        day = start_day + datetime.timedelta(days=i)
+        if day.weekday() < 5:  # Only weekdays
+            for t in times:
+                starts.append(datetime.datetime.combine(day, t))
+    starts.sort()
+    return starts
+
+
+class SlotIndex:
+    """Interval index over fixed-length slots with per-slot booking counts"""
+
+    def __init__(self, starts, duration=SLOT_DURATION, capacity=SLOT_CAPACITY):
+        self.starts = starts
+        self.duration = duration
+        self.capacity = capacity
+        self.load = [0] * len(starts)
+
+    def find(self, moment):
+        """Return the index of the slot whose interval contains moment, or None"""
+        i = bisect_right(self.starts, moment) - 1
+        if i >= 0 and moment < self.starts[i] + self.duration:
+            return i
+        return None
+
+    def add_booking(self, moment):
+        i = self.find(moment)
+        if i is not None:
+            self.load[i] += 1
+
+    def free_capacity(self):
+        return sum(max(0, self.capacity - n) for n in self.load)
+
+    def assign(self, num_candidates, per_candidate=SLOTS_PER_CANDIDATE):
+        """
+        Greedily assign distinct slots to each candidate.
+
+        A min-heap keyed on (load, start) hands every candidate the least
+        loaded, earliest slots available, each on a different day where
+        possible. Returns a list of slot index lists, one per candidate;
+        a candidate gets an empty list once capacity runs out.
+        """
+        heap = [(n, i) for i, n in enumerate(self.load) if n < self.capacity]
+        heapq.heapify(heap)
+
+        assignments = []
+        for _ in range(num_candidates):
+            chosen, skipped, days = [], [], set()
+            while heap and len(chosen) < per_candidate:
+                entry = heapq.heappop(heap)
+                if self.starts[entry[1]].date() in days:
+                    skipped.append(entry)
+                    continue
+                chosen.append(entry)
+                days.add(self.starts[entry[1]].date())
+
+            # Fall back to same-day slots if there are not enough days left
+            while skipped and len(chosen) < per_candidate:
+                chosen.append(skipped.pop(0))
+            for entry in skipped:
+                heapq.heappush(heap, entry)
+
+            for n, i in chosen:
+                self.load[i] = n + 1
+                if n + 1 < self.capacity:
+                    heapq.heappush(heap, (n + 1, i))
+
+            assignments.append(sorted(i for _, i in chosen))
+        return assignments
+
+
+def _load_index(cursor, start_day, num_days):
+    index = SlotIndex(build_slot_grid(start_day, num_days))
+    if not index.starts:
+        return index
+    window_end = index.starts[-1] + SLOT_DURATION
+    cursor.execute(
+        "SELECT scheduled_date FROM interviews "
+        "WHERE scheduled_date >= ? AND scheduled_date < ? "
+        "AND (status = 'confirmed' OR (status = 'offered' AND created_at >= ?))",
+        (index.starts[0].strftime(DB_DATETIME_FORMAT), window_end.strftime(DB_DATETIME_FORMAT), _offer_cutoff())
+    )
+    for (scheduled_date,) in cursor.fetchall():
+        index.add_booking(datetime.datetime.strptime(scheduled_date, DB_DATETIME_FORMAT))
+    return index
+
+
+def _format_options(candidate_name, job_title, slot_starts, interview_ids=None):
+    dates, times = [], []
+    for start in slot_starts:
+        date_label = start.strftime(DATE_FORMAT)
+        time_label = start.strftime("%I:%M %p").lstrip('0')
+        if date_label not in dates:
+            dates.append(date_label)
+        if time_label not in times:
+            times.append(time_label)
+
+    slots = []
+    for n, start in enumerate(slot_starts):
+        slot = {
+            'date': start.strftime(DATE_FORMAT),
+            'time': start.strftime("%I:%M %p").lstrip('0'),
+            'start': start.strftime(DB_DATETIME_FORMAT)
+        }
+        if interview_ids:
+            slot['interview_id'] = interview_ids[n]
+        slots.append(slot)
+
+    return {
+        "candidate_name": candidate_name,
+        "job_title": job_title,
+        "dates": dates,
+        "times": times,
+        "slots": slots
+    }
+
+
+def interview_generation(conn, now=None):
+    """
+    Return a marker that changes whenever the slot previews could change.
+
+    That is the write counter, the calendar day (the booking window moves
+    with it) and the newest offer that has gone stale. Both lookups are
+    single index seeks.
+    """
+    now = now or datetime.datetime.now()
+    cursor = conn.cursor()
+    cursor.execute("SELECT value FROM scheduler_state WHERE name = 'interviews'")
+    row = cursor.fetchone()
+    cursor.execute(
+        "SELECT MAX(created_at) FROM interviews WHERE status = 'offered' AND created_at < ?",
+        (_offer_cutoff(),)
+    )
+    return now.date().isoformat(), row[0] if row else 0, cursor.fetchone()[0]
+
+
+def _fill_index(cursor, start_day, needed):
+    # Grow the window a week at a time until the batch fits or the window is maxed out
+    num_days = WINDOW_DAYS
+    index = _load_index(cursor, start_day, num_days)
+    while index.free_capacity() < needed and num_days < MAX_WINDOW_DAYS:
+        num_days = min(MAX_WINDOW_DAYS, num_days + 7)
+        index = _load_index(cursor, start_day, num_days)
+    return index
+
+
+def _insert_offer(cursor, candidate_name, email, job_title, start):
+    cursor.execute(
+        'INSERT INTO interviews (candidate_name, email, job_title, scheduled_date, status) '
+        'VALUES (?, ?, ?, ?, ?)',
+        (candidate_name, email, job_title, start.strftime(DB_DATETIME_FORMAT), 'offered')
+    )
+    return cursor.lastrowid
+
+
+def allocate_interview_slots(db_path, candidates, job_title, reserve=True, now=None):
+    """
+    Allocate distinct interview slots to a batch of candidates.
+
+    candidates is a list of dicts with a 'name' and optional 'email'. With
+    reserve=True the slots are written to the interviews table as 'offered'
+    in a single transaction, and SlotCapacityError is raised (reserving
+    nothing) if any candidate would be left without a slot. With
+    reserve=False the allocation is only a preview: nothing is persisted and
+    candidates past the available capacity get no slots. Returns one
+    interview options dict per candidate, in input order.
+    """
+    if not candidates:
+        return []
+
+    now = now or datetime.datetime.now()
+    start_day = (now + datetime.timedelta(days=FIRST_DAY_OFFSET)).date()
+    needed = len(candidates) * SLOTS_PER_CANDIDATE
+
+    if not reserve:
+        # Previews only read, so they never wait behind reservations
+        conn = sqlite3.connect(db_path, timeout=30)
+        try:
+            index = _fill_index(conn.cursor(), start_day, needed)
+        finally:
+            conn.close()
+        return [
+            _format_options(candidate.get('name'), job_title, [index.starts[i] for i in slot_ids])
+            for candidate, slot_ids in zip(candidates, index.assign(len(candidates)))
+        ]
+
+    with _allocation_lock:
+        conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        cursor = conn.cursor()
+        try:
+            # Take the write lock up front so concurrent allocators see each other's rows
+            cursor.execute('BEGIN IMMEDIATE')
+            _expire_stale_offers(cursor)
+            index = _fill_index(cursor, start_day, needed)
+            assignments = index.assign(len(candidates))
+
+            unserved = sum(1 for slot_ids in assignments if not slot_ids)
+            if unserved:
+                raise SlotCapacityError(
+                    f"No interview slots left for {unserved} of {len(candidates)} candidates "
+                    f"in the next {MAX_WINDOW_DAYS} days"
+                )
+
+            _bump_generation(cursor)
+            results = []
+            for candidate, slot_ids in zip(candidates, assignments):
+                slot_starts = [index.starts[i] for i in slot_ids]
+                interview_ids = [
+                    _insert_offer(cursor, candidate.get('name'), candidate.get('email'), job_title, start)
+                    for start in slot_starts
+                ]
+                results.append(_format_options(candidate.get('name'), job_title, slot_starts, interview_ids))
+
+            cursor.execute('COMMIT')
+            return results
+        except Exception:
+            if conn.in_transaction:
+                cursor.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+
+def reserve_interview_slot(db_path, candidate_name, email, job_title, start, now=None):
+    """
+    Reserve one specific slot, e.g. the one picked from a preview.
+
+    start is the slot's start in DB_DATETIME_FORMAT. Raises ValueError if it
+    is not a slot start inside the bookable window and SlotCapacityError if
+    the slot is already full. Returns the interview options dict for the
+    reserved slot.
+    """
+    try:
+        start = datetime.datetime.strptime(start, DB_DATETIME_FORMAT)
+    except TypeError:
+        raise ValueError(f"{start!r} is not an interview slot")
+
+    # Same window allocate_interview_slots hands slots out from
+    now = now or datetime.datetime.now()
+    first_day = (now + datetime.timedelta(days=FIRST_DAY_OFFSET)).date()
+    if not first_day <= start.date() < first_day + datetime.timedelta(days=MAX_WINDOW_DAYS):
+        raise ValueError(f"{start} is outside the bookable interview window")
+
+    with _allocation_lock:
+        conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            _expire_stale_offers(cursor)
+            index = _load_index(cursor, start.date(), 1)
+            i = index.find(start)
+            if i is None or index.starts[i] != start:
+                raise ValueError(f"{start} is not an interview slot")
+            if index.load[i] >= index.capacity:
+                raise SlotCapacityError(f"The {start.strftime(DATE_FORMAT)} {start.strftime('%I:%M %p').lstrip('0')} slot is already taken")
+
+            interview_id = _insert_offer(cursor, candidate_name, email, job_title, start)
+            _bump_generation(cursor)
+            cursor.execute('COMMIT')
+            return _format_options(candidate_name, job_title, [start], [interview_id])
+        except Exception:
+            if conn.in_transaction:
+                cursor.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+
+def confirm_interview_slot(db_path, interview_id):
+    """
+    Confirm an offered slot and release the candidate's other offers for the job.
+
+    Returns False if the offer no longer exists, was cancelled or has expired.
+    """
+    conn = sqlite3.connect(db_path, timeout=30)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.execute(
+            "SELECT email, job_title FROM interviews WHERE id = ? AND status = 'offered' AND created_at >= ?",
+            (interview_id, _offer_cutoff())
+        )
+        row = cursor.fetchone()
+        if not row:
+            conn.rollback()
+            return False
+
+        cursor.execute("UPDATE interviews SET status = 'confirmed' WHERE id = ?", (interview_id,))
+        cursor.execute(
+            "UPDATE interviews SET status = 'cancelled' "
+            "WHERE email = ? AND job_title = ? AND status = 'offered' AND id != ?",
+            (row[0], row[1], interview_id)
+        )
+        _bump_generation(cursor)
+        conn.commit()
+        return True
+    finally:
+        conn.close()
+
+
+def release_interview_slots(db_path, interview_ids):
+    """Cancel offered interviews so their slots can be handed out again"""
+    if not interview_ids:
+        return
+    conn = sqlite3.connect(db_path, timeout=30)
+    cursor = conn.cursor()
+    cursor.executemany(
+        "UPDATE interviews SET status = 'cancelled' WHERE id = ? AND status = 'offered'",
+        [(interview_id,) for interview_id in interview_ids]
+    )
+    _bump_generation(cursor)
+    conn.commit()
+    conn.close()
@@ -0,0 +1,302 @@
+"""
+Versioned job skill lists and incrementally maintained match scores.
+
+Every resume's filtered keywords are stored as a term -> resume postings
+list. Each job keeps its current term set in job_terms, and match_terms /
+match_scores hold, per job, which of those terms every resume contains.
+When a job's skills or description change, only the postings of the added
+and removed terms are touched, so all other stored scores stay as they are.
+"""
+import json
+
+from utils.text import extract_keywords, filter_keywords
+
+# Resumes tokenized per postings insert batch during a sync
+SYNC_BATCH_SIZE = 20000
+
+
+def init_screening_tables(cursor):
+    """Create the skill version, postings and match score tables"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS job_skill_versions (
+        job_title TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        skills TEXT NOT NULL,
+        terms TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (job_title, version)
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS job_terms (
+        job_title TEXT NOT NULL,
+        term TEXT NOT NULL,
+        PRIMARY KEY (job_title, term)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_job_terms_term ON job_terms (term)
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS resume_terms (
+        term TEXT NOT NULL,
+        resume_id INTEGER NOT NULL,
+        PRIMARY KEY (term, resume_id)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS match_terms (
+        job_title TEXT NOT NULL,
+        resume_id INTEGER NOT NULL,
+        term TEXT NOT NULL,
+        PRIMARY KEY (job_title, resume_id, term)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS match_scores (
+        job_title TEXT NOT NULL,
+        resume_id INTEGER NOT NULL,
+        matched_count INTEGER NOT NULL,
+        PRIMARY KEY (job_title, resume_id)
+    ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS index_state (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    )
+    ''')
+
+
+def job_terms_for(keywords, skills):
+    """Return the sorted screening terms for a job's keywords and skill list"""
+    if isinstance(keywords, str):
+        keywords = keywords.split(', ')
+    skill_words = extract_keywords(' '.join(skills)).split(', ') if skills else []
+    return sorted(set(filter_keywords(list(keywords or []) + skill_words)))
+
+
+def _in_clause(values):
+    return ', '.join('?' for _ in values)
+
+
+def _begin(conn):
+    # Take the write lock up front so concurrent updaters never interleave deltas
+    if not conn.in_transaction:
+        conn.execute('BEGIN IMMEDIATE')
+
+
+def sync_resume_index(conn):
+    """
+    Add postings and match scores for resumes stored since the last sync.
+
+    Resumes are insert-only, so a high-water mark on resumes.id is enough
+    to find the ones that still need indexing. Returns the number indexed.
+    """
+    cursor = conn.cursor()
+
+    def watermarks():
+        cursor.execute("SELECT value FROM index_state WHERE name = 'resume_terms'")
+        row = cursor.fetchone()
+        cursor.execute('SELECT MAX(id) FROM resumes')
+        return (row[0] if row else 0), (cursor.fetchone()[0] or 0)
+
+    last_id, max_id = watermarks()
+    if max_id <= last_id:
+        return 0
+
+    # Re-read under the write lock in case another process synced meanwhile
+    _begin(conn)
+    last_id, max_id = watermarks()
+    if max_id <= last_id:
+        conn.commit()
+        return 0
+
+    count = 0
+    reader = conn.cursor()
+    reader.execute('SELECT id, keywords FROM resumes WHERE id > ?', (last_id,))
+    while True:
+        rows = reader.fetchmany(SYNC_BATCH_SIZE)
+        if not rows:
+            break
+        count += len(rows)
+        postings = []
+        for resume_id, keywords in rows:
+            for term in set(filter_keywords(keywords or '')):
+                postings.append((term, resume_id))
+        # Sorted inserts follow the (term, resume_id) key order of the postings table
+        postings.sort()
+        cursor.executemany('INSERT OR IGNORE INTO resume_terms (term, resume_id) VALUES (?, ?)', postings)
+
+    # Match the new resumes against every job's current terms
+    cursor.execute('''
+    INSERT OR IGNORE INTO match_terms (job_title, resume_id, term)
+    SELECT jt.job_title, rt.resume_id, jt.term
+    FROM job_terms jt JOIN resume_terms rt ON rt.term = jt.term AND rt.resume_id > ?
+    ''', (last_id,))
+    cursor.execute('''
+    INSERT OR REPLACE INTO match_scores (job_title, resume_id, matched_count)
+    SELECT jt.job_title, rt.resume_id, COUNT(*)
+    FROM job_terms jt JOIN resume_terms rt ON rt.term = jt.term AND rt.resume_id > ?
+    GROUP BY jt.job_title, rt.resume_id
+    ''', (last_id,))
+
+    cursor.execute(
+        "INSERT OR REPLACE INTO index_state (name, value) VALUES ('resume_terms', ?)",
+        (max_id,)
+    )
+    conn.commit()
+    return count
+
+
+def _apply_term_delta(cursor, job_title, added, removed):
+    """Adjust stored scores for resumes containing added or removed terms"""
+    if removed:
+        placeholders = _in_clause(removed)
+        cursor.execute(f'''
+        UPDATE match_scores
+        SET matched_count = matched_count - (
+            SELECT COUNT(*) FROM match_terms mt
+            WHERE mt.job_title = match_scores.job_title
+              AND mt.resume_id = match_scores.resume_id
+              AND mt.term IN ({placeholders})
+        )
+        WHERE job_title = ? AND resume_id IN (
+            SELECT resume_id FROM resume_terms WHERE term IN ({placeholders})
+        )
+        ''', removed + [job_title] + removed)
+        cursor.execute(
+            f'DELETE FROM match_terms WHERE job_title = ? AND resume_id IN ('
+            f'SELECT resume_id FROM resume_terms WHERE term IN ({placeholders})) '
+            f'AND term IN ({placeholders})',
+            [job_title] + removed + removed
+        )
+        cursor.execute('DELETE FROM match_scores WHERE job_title = ? AND matched_count <= 0', (job_title,))
+        cursor.execute(
+            f'DELETE FROM job_terms WHERE job_title = ? AND term IN ({placeholders})',
+            [job_title] + removed
+        )
+
+    if added:
+        placeholders = _in_clause(added)
+        cursor.executemany(
+            'INSERT OR IGNORE INTO job_terms (job_title, term) VALUES (?, ?)',
+            [(job_title, term) for term in added]
+        )
+        cursor.execute(f'''
+        INSERT OR IGNORE INTO match_terms (job_title, resume_id, term)
+        SELECT ?, resume_id, term FROM resume_terms WHERE term IN ({placeholders})
+        ''', [job_title] + added)
+        cursor.execute(f'''
+        INSERT INTO match_scores (job_title, resume_id, matched_count)
+        SELECT ?, resume_id, COUNT(*) FROM resume_terms
+        WHERE term IN ({placeholders}) GROUP BY resume_id
+        ON CONFLICT (job_title, resume_id)
+        DO UPDATE SET matched_count = matched_count + excluded.matched_count
+        ''', [job_title] + added)
+
+
+def corpus_version(conn):
+    """Return a marker that changes whenever a resume is added"""
+    cursor = conn.cursor()
+    cursor.execute('SELECT MAX(id) FROM resumes')
+    return cursor.fetchone()[0] or 0
+
+
+def get_job_version(conn, job_title):
+    """Return (version, skills, terms) for the job's current skill list, or None"""
+    cursor = conn.cursor()
+    cursor.execute(
+        'SELECT version, skills, terms FROM job_skill_versions '
+        'WHERE job_title = ? ORDER BY version DESC LIMIT 1',
+        (job_title,)
+    )
+    row = cursor.fetchone()
+    if not row:
+        return None
+    return row[0], json.loads(row[1]), json.loads(row[2])
+
+
+def update_job_skills(conn, job_title, skills=None, description=None, default_skills=(), seed_only=False):
+    """
+    Record a new skill version for a job and rescore only what changed.
+
+    Everything is resolved under the write lock, so concurrent updates never
+    overwrite each other. skills=None keeps the current list, or uses
+    default_skills for a job without a version. A new description replaces
+    the job's description and keywords in the same transaction. With
+    seed_only=True nothing is written if the job already has a version, and
+    an update that changes neither the skills nor the description keeps the
+    current version. Returns a dict with the version and the terms that were
+    added and removed, or None if the job does not exist.
+    """
+    _begin(conn)
+    cursor = conn.cursor()
+    cursor.execute('SELECT description, keywords FROM job_descriptions WHERE title = ?', (job_title,))
+    row = cursor.fetchone()
+    if not row:
+        conn.rollback()
+        return None
+
+    current = get_job_version(conn, job_title)
+    if current and seed_only:
+        conn.commit()
+        return {'version': current[0], 'added': [], 'removed': []}
+
+    keywords = row[1]
+    description_changed = description is not None and description != row[0]
+    if description_changed:
+        keywords = extract_keywords(description)
+        cursor.execute(
+            'UPDATE job_descriptions SET description = ?, keywords = ? WHERE title = ?',
+            (description, keywords, job_title)
+        )
+    if skills is None:
+        skills = current[1] if current else list(default_skills)
+
+    old_terms = set(current[2]) if current else set()
+    new_terms = job_terms_for(keywords, skills)
+
+    added = sorted(set(new_terms) - old_terms)
+    removed = sorted(old_terms - set(new_terms))
+    if current and not added and not removed and list(skills) == current[1] and not description_changed:
+        # Nothing changed, so keep the version (and the ETags built from it)
+        conn.commit()
+        return {'version': current[0], 'added': [], 'removed': []}
+    _apply_term_delta(cursor, job_title, added, removed)
+
+    version = current[0] + 1 if current else 1
+    cursor.execute(
+        'INSERT INTO job_skill_versions (job_title, version, skills, terms) VALUES (?, ?, ?, ?)',
+        (job_title, version, json.dumps(list(skills)), json.dumps(new_terms))
+    )
+    conn.commit()
+    return {'version': version, 'added': added, 'removed': removed}
+
+
+def ensure_job_indexed(conn, job_title, default_skills):
+    """Seed version 1 of a job's skills from the defaults if it has none yet"""
+    current = get_job_version(conn, job_title)
+    if current:
+        return current
+    # The seed check is repeated under the write lock so only one request seeds
+    update_job_skills(conn, job_title, default_skills=default_skills, seed_only=True)
+    return get_job_version(conn, job_title)
+
+
+def get_matches(conn, job_title):
+    """Return (resume_id, cv_number, content, matched_terms) for every resume matching the job"""
+    cursor = conn.cursor()
+    cursor.execute('''
+    SELECT ms.resume_id, r.cv_number, r.content, GROUP_CONCAT(mt.term, ', ')
+    FROM match_scores ms
+    JOIN resumes r ON r.id = ms.resume_id
+    JOIN match_terms mt ON mt.job_title = ms.job_title AND mt.resume_id = ms.resume_id
+    WHERE ms.job_title = ?
+    GROUP BY ms.resume_id
+    ORDER BY ms.matched_count DESC, ms.resume_id
+    ''', (job_title,))
+    return [
+        (resume_id, cv_number, content, terms.split(', '))
+        for resume_id, cv_number, content, terms in cursor.fetchall()
+    ]
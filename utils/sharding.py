@@ -0,0 +1,599 @@
+"""
+Sharded screening: resume shards served by workers, queried by a coordinator.
+
+Each shard is its own SQLite file holding a slice of the resumes and their
+term -> resume postings. A worker process serves one shard over HTTP. The
+coordinator sends a job's terms to every shard in parallel, and each shard
+returns its best matches ordered by matched term count. The coordinator then
+merges them into the same list the single-node index would produce.
+
+The main database records which shard owns each resume, by a stable id
+registered per shard URL, so shards can be removed or reordered in the
+shard list without losing track of their resumes. New resumes go to
+the least loaded shard, and resumes are moved when the shard count changes
+or the shards drift out of balance. Assignments are committed first and
+marked pending; flush_pending() then copies them to the shards outside the
+database lock, so a slow or unreachable shard never blocks a writer.
+
+Run a worker, or rebalance after changing the shard list, with:
+    python -m utils.sharding worker --db shard0.db --port 7001
+    python -m utils.sharding rebalance --main-db job_screening.db --shards URL,URL
+"""
+import argparse
+import heapq
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.text import filter_keywords
+
+logger = logging.getLogger(__name__)
+
+# Resumes pushed to a shard per request while ingesting or rebalancing
+INGEST_BATCH_SIZE = 2000
+# Shards may differ by this fraction of the average size before rebalancing
+REBALANCE_TOLERANCE = 0.1
+HTTP_TIMEOUT = 60
+# Attempts per batch when pushing to a shard, with exponential backoff between them
+PUSH_RETRIES = 3
+PUSH_BACKOFF_SECONDS = 0.5
+
+
+def init_shard_db(cursor):
+    """Create the resume and postings tables of a shard database"""
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS resumes (
+        id INTEGER PRIMARY KEY,
+        name TEXT,
+        cv_number TEXT,
+        keywords TEXT,
+        content TEXT
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS resume_terms (
+        term TEXT NOT NULL,
+        resume_id INTEGER NOT NULL,
+        PRIMARY KEY (term, resume_id)
+    ) WITHOUT ROWID
+    ''')
+
+
+def init_shard_assignments(cursor):
+    """
+    Create the resume -> shard assignment table in the main database.
+
+    pending is 1 until the resume has been copied to its shard, and
+    previous_shard holds the shard a moved resume still has to be removed from.
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS resume_shards (
+        resume_id INTEGER PRIMARY KEY,
+        shard INTEGER NOT NULL,
+        pending INTEGER NOT NULL DEFAULT 0,
+        previous_shard INTEGER
+    )
+    ''')
+    # Tables created before the pending state only hold resumes already pushed
+    cursor.execute('PRAGMA table_info(resume_shards)')
+    columns = {row[1] for row in cursor.fetchall()}
+    if 'pending' not in columns:
+        cursor.execute('ALTER TABLE resume_shards ADD COLUMN pending INTEGER NOT NULL DEFAULT 0')
+    if 'previous_shard' not in columns:
+        cursor.execute('ALTER TABLE resume_shards ADD COLUMN previous_shard INTEGER')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_resume_shards_shard ON resume_shards (shard)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_resume_shards_pending ON resume_shards (pending)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_resume_shards_previous ON resume_shards (previous_shard)
+    ''')
+    # Stable shard ids; resume_shards.shard and previous_shard refer to shard_nodes.id
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS shard_nodes (
+        id INTEGER PRIMARY KEY,
+        key TEXT NOT NULL UNIQUE
+    )
+    ''')
+
+
+def _begin(conn):
+    # Hold the main database write lock while assignments change
+    if not conn.in_transaction:
+        conn.execute('BEGIN IMMEDIATE')
+
+
+def select_matches(matches, min_count, k):
+    """
+    Trim matches sorted by (count desc, resume_id) to what screening needs.
+
+    That is every match with at least min_count terms (the score threshold),
+    or the first k when fewer than k clear it.
+    """
+    selected = []
+    for match in matches:
+        if match['count'] < min_count and len(selected) >= k:
+            break
+        selected.append(match)
+    return selected
+
+
+class ShardStore:
+    """One shard's SQLite database"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.key = os.path.abspath(db_path)
+        conn = self._connect()
+        init_shard_db(conn.cursor())
+        conn.commit()
+        conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def add_resumes(self, rows):
+        """Store (id, name, cv_number, keywords, content) rows and their postings"""
+        postings = []
+        for resume_id, _, _, keywords, _ in rows:
+            for term in set(filter_keywords(keywords or '')):
+                postings.append((term, resume_id))
+        postings.sort()
+
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.executemany('INSERT OR REPLACE INTO resumes VALUES (?, ?, ?, ?, ?)', rows)
+        cursor.executemany('INSERT OR IGNORE INTO resume_terms (term, resume_id) VALUES (?, ?)', postings)
+        conn.commit()
+        conn.close()
+        return len(rows)
+
+    def remove_resumes(self, resume_ids):
+        """Drop resumes and their postings, e.g. after moving them to another shard"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        for resume_id in resume_ids:
+            cursor.execute('SELECT keywords FROM resumes WHERE id = ?', (resume_id,))
+            row = cursor.fetchone()
+            if not row:
+                continue
+            cursor.executemany(
+                'DELETE FROM resume_terms WHERE term = ? AND resume_id = ?',
+                [(term, resume_id) for term in set(filter_keywords(row[0] or ''))]
+            )
+            cursor.execute('DELETE FROM resumes WHERE id = ?', (resume_id,))
+        conn.commit()
+        conn.close()
+        return len(resume_ids)
+
+    def search(self, terms, min_count, k):
+        """Return this shard's matches for the terms, trimmed by select_matches"""
+        if not terms:
+            return []
+        placeholders = ', '.join('?' for _ in terms)
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f'''
+        SELECT resume_id, COUNT(*) AS matched, GROUP_CONCAT(term, ', ')
+        FROM resume_terms WHERE term IN ({placeholders})
+        GROUP BY resume_id
+        ORDER BY matched DESC, resume_id
+        ''', list(terms))
+
+        matches = []
+        for resume_id, count, matched_terms in cursor:
+            if count < min_count and len(matches) >= k:
+                break
+            matches.append({'resume_id': resume_id, 'count': count, 'terms': sorted(matched_terms.split(', '))})
+
+        by_id = {match['resume_id']: match for match in matches}
+        ids = list(by_id)
+        for start in range(0, len(ids), INGEST_BATCH_SIZE):
+            batch = ids[start:start + INGEST_BATCH_SIZE]
+            cursor.execute(
+                f"SELECT id, cv_number, content FROM resumes WHERE id IN ({', '.join('?' for _ in batch)})",
+                batch
+            )
+            for resume_id, cv_number, content in cursor.fetchall():
+                by_id[resume_id]['cv_number'], by_id[resume_id]['content'] = cv_number, content
+        conn.close()
+        return matches
+
+    def stats(self):
+        conn = self._connect()
+        count = conn.execute('SELECT COUNT(*) FROM resumes').fetchone()[0]
+        conn.close()
+        return {'db': self.db_path, 'resumes': count}
+
+
+class HttpShard:
+    """Client for a shard served by a worker process"""
+
+    def __init__(self, url):
+        self.url = url.strip().rstrip('/')
+        # The same worker always gets the same key, however its URL is spelled
+        parts = urllib.parse.urlsplit(self.url)
+        self.key = f"{parts.scheme.lower()}://{parts.netloc.lower()}{parts.path}"
+
+    def _call(self, method, path, payload=None):
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        req = urllib.request.Request(
+            self.url + path, data=data, method=method,
+            headers={'Content-Type': 'application/json'}
+        )
+        with urllib.request.urlopen(req, timeout=HTTP_TIMEOUT) as response:
+            return json.loads(response.read())
+
+    def add_resumes(self, rows):
+        return self._call('POST', '/shard/resumes', {'rows': rows})['added']
+
+    def remove_resumes(self, resume_ids):
+        return self._call('DELETE', '/shard/resumes', {'ids': resume_ids})['removed']
+
+    def search(self, terms, min_count, k):
+        return self._call('POST', '/shard/search', {'terms': terms, 'min_count': min_count, 'k': k})['matches']
+
+    def stats(self):
+        return self._call('GET', '/shard/stats')
+
+
+class ShardCoordinator:
+    """Fans screening queries out to every shard and merges their results"""
+
+    def __init__(self, shards):
+        # Listing the same shard twice would count its resumes twice
+        unique = {}
+        for shard in shards:
+            unique.setdefault(shard.key, shard)
+        self.shards = list(unique.values())
+        self.executor = ThreadPoolExecutor(max_workers=max(1, len(self.shards)))
+        # One background flush at a time, plus at most one queued behind it
+        self.flusher = ThreadPoolExecutor(max_workers=1)
+        self._flush_lock = threading.Lock()
+        self._flush_queued = False
+        # Stable shard id -> shard, filled in on first use of the main database
+        self._by_id = None
+
+    @classmethod
+    def from_urls(cls, urls):
+        return cls(HttpShard(url) for url in urls if url.strip())
+
+    def search(self, terms, min_count, k):
+        """Return the merged matches in the same order as the single-node index"""
+        terms = sorted(set(terms))
+        results = self.executor.map(lambda shard: shard.search(terms, min_count, k), self.shards)
+        merged = {}
+        for shard_matches in results:
+            # A resume being moved can briefly live on two shards
+            for match in shard_matches:
+                merged[match['resume_id']] = match
+        ordered = sorted(merged.values(), key=lambda match: (-match['count'], match['resume_id']))
+        return select_matches(ordered, min_count, k)
+
+    def _shards_by_id(self, conn):
+        """
+        Return {stable shard id: shard}, registering shards seen for the first time.
+
+        Ids are handed out in list order starting at 0, so a database that
+        recorded list positions before shard_nodes existed keeps its meaning.
+        """
+        if self._by_id is None:
+            cursor = conn.cursor()
+            _begin(conn)
+            try:
+                by_id = {}
+                for shard in self.shards:
+                    cursor.execute(
+                        'INSERT OR IGNORE INTO shard_nodes (id, key) '
+                        'SELECT COALESCE(MAX(id) + 1, 0), ? FROM shard_nodes',
+                        (shard.key,)
+                    )
+                    cursor.execute('SELECT id FROM shard_nodes WHERE key = ?', (shard.key,))
+                    by_id[cursor.fetchone()[0]] = shard
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            self._by_id = by_id
+        return self._by_id
+
+    def _shard_loads(self, cursor, shard_ids):
+        loads = dict.fromkeys(shard_ids, 0)
+        placeholders = ', '.join('?' for _ in shard_ids)
+        cursor.execute(
+            f'SELECT shard, COUNT(*) FROM resume_shards WHERE shard IN ({placeholders}) GROUP BY shard',
+            list(shard_ids)
+        )
+        for shard_id, count in cursor.fetchall():
+            loads[shard_id] = count
+        return loads
+
+    def pending_count(self, conn):
+        """Return how many assigned resumes have not reached their shard yet"""
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM resume_shards WHERE pending = 1')
+        return cursor.fetchone()[0]
+
+    def ingest(self, conn):
+        """
+        Assign resumes without a shard to the least loaded shards.
+
+        Resumes are insert-only, so everything above the highest assigned id
+        is new. The assignments are committed as pending and copied to the
+        shards by flush_pending(). Returns the number of resumes assigned.
+        """
+        cursor = conn.cursor()
+
+        def watermarks():
+            cursor.execute('SELECT MAX(resume_id) FROM resume_shards')
+            last_id = cursor.fetchone()[0] or 0
+            cursor.execute('SELECT MAX(id) FROM resumes')
+            return last_id, cursor.fetchone()[0] or 0
+
+        last_id, max_id = watermarks()
+        if max_id <= last_id:
+            return 0
+
+        shard_ids = list(self._shards_by_id(conn))
+        _begin(conn)
+        try:
+            # Re-read under the write lock in case another process ingested meanwhile
+            last_id, max_id = watermarks()
+            cursor.execute('SELECT id FROM resumes WHERE id > ? ORDER BY id', (last_id,))
+            new_ids = [row[0] for row in cursor.fetchall()]
+
+            # Hand each new resume to the currently least loaded shard
+            heap = [(load, shard_id) for shard_id, load in self._shard_loads(cursor, shard_ids).items()]
+            heapq.heapify(heap)
+            assignments = []
+            for resume_id in new_ids:
+                load, shard_id = heapq.heappop(heap)
+                assignments.append((resume_id, shard_id))
+                heapq.heappush(heap, (load + 1, shard_id))
+
+            cursor.executemany(
+                'INSERT INTO resume_shards (resume_id, shard, pending) VALUES (?, ?, 1)',
+                assignments
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return len(new_ids)
+
+    def rebalance(self, conn):
+        """
+        Reassign resumes off shards that are gone or above the target size.
+
+        Only the assignments change here; flush_pending() copies each moved
+        resume to its new shard before removing it from the old one, so
+        queries never miss it. Resumes still waiting for a push stay where
+        they are. Returns the number of resumes reassigned.
+        """
+        shard_ids = list(self._shards_by_id(conn))
+        placeholders = ', '.join('?' for _ in shard_ids)
+        cursor = conn.cursor()
+        _begin(conn)
+        try:
+            # Any shard id outside the current list is gone, wherever it used to sit in the list
+            cursor.execute(
+                f'SELECT resume_id, previous_shard FROM resume_shards '
+                f'WHERE shard NOT IN ({placeholders}) ORDER BY resume_id',
+                shard_ids
+            )
+            orphaned = cursor.fetchall()
+            loads = self._shard_loads(cursor, shard_ids)
+            total = sum(loads.values()) + len(orphaned)
+            if total == 0:
+                conn.commit()
+                return 0
+
+            average = total / len(shard_ids)
+            if not orphaned and max(loads.values()) - min(loads.values()) <= max(1, REBALANCE_TOLERANCE * average):
+                conn.commit()
+                return 0
+
+            target = math.ceil(average)
+            # (resume_id, old shard or None) pairs waiting for a new home
+            to_move = []
+            for shard_id, load in loads.items():
+                if load > target:
+                    cursor.execute(
+                        'SELECT resume_id FROM resume_shards '
+                        'WHERE shard = ? AND pending = 0 AND previous_shard IS NULL '
+                        'ORDER BY resume_id DESC LIMIT ?',
+                        (shard_id, load - target)
+                    )
+                    batch = [row[0] for row in cursor.fetchall()]
+                    to_move.extend((resume_id, shard_id) for resume_id in batch)
+                    loads[shard_id] -= len(batch)
+            # A shard that is gone has nothing left to remove, but an unfinished move still does
+            to_move.extend(orphaned)
+
+            moved = 0
+            for shard_id in sorted(shard_ids, key=lambda s: loads[s]):
+                take = max(0, target - loads[shard_id])
+                batch, to_move = to_move[:take], to_move[take:]
+                cursor.executemany(
+                    'UPDATE resume_shards SET shard = ?, pending = 1, previous_shard = ? WHERE resume_id = ?',
+                    [(shard_id, source, resume_id) for resume_id, source in batch]
+                )
+                moved += len(batch)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return moved
+
+    def _with_retries(self, action, *args):
+        for attempt in range(PUSH_RETRIES):
+            try:
+                return action(*args)
+            except OSError:
+                if attempt == PUSH_RETRIES - 1:
+                    raise
+                time.sleep(PUSH_BACKOFF_SECONDS * 2 ** attempt)
+
+    def flush_pending(self, db_path):
+        """
+        Copy pending resumes to their shards and drop moved ones from their old shard.
+
+        Shard calls happen outside the database lock and are retried with
+        backoff. A shard that keeps failing is logged and its resumes stay
+        pending for the next flush. Returns the number of resumes pushed.
+        """
+        conn = sqlite3.connect(db_path, timeout=30)
+        cursor = conn.cursor()
+        pushed = 0
+        try:
+            by_id = self._shards_by_id(conn)
+            placeholders = ', '.join('?' for _ in by_id)
+            cursor.execute(
+                f'SELECT shard, resume_id FROM resume_shards '
+                f'WHERE pending = 1 AND shard IN ({placeholders}) ORDER BY shard, resume_id',
+                list(by_id)
+            )
+            by_shard = {}
+            for shard_id, resume_id in cursor.fetchall():
+                by_shard.setdefault(shard_id, []).append(resume_id)
+
+            for shard_id, resume_ids in by_shard.items():
+                for start in range(0, len(resume_ids), INGEST_BATCH_SIZE):
+                    batch = resume_ids[start:start + INGEST_BATCH_SIZE]
+                    placeholders = ', '.join('?' for _ in batch)
+                    cursor.execute(
+                        f'SELECT id, name, cv_number, keywords, content FROM resumes WHERE id IN ({placeholders})',
+                        batch
+                    )
+                    rows = [list(row) for row in cursor.fetchall()]
+                    try:
+                        self._with_retries(by_id[shard_id].add_resumes, rows)
+                    except OSError as e:
+                        logger.warning(f"Shard {by_id[shard_id].key} unreachable, {len(resume_ids) - start} resumes left pending: {e}")
+                        break
+                    # The shard check skips rows reassigned while the push was in flight
+                    cursor.executemany(
+                        'UPDATE resume_shards SET pending = 0 WHERE resume_id = ? AND shard = ?',
+                        [(resume_id, shard_id) for resume_id in batch]
+                    )
+                    conn.commit()
+                    pushed += len(batch)
+
+            # Old copies are only dropped once the new shard holds the resume
+            cursor.execute(
+                'SELECT previous_shard, resume_id FROM resume_shards '
+                'WHERE previous_shard IS NOT NULL AND pending = 0 ORDER BY previous_shard, resume_id'
+            )
+            by_source = {}
+            for source, resume_id in cursor.fetchall():
+                by_source.setdefault(source, []).append(resume_id)
+
+            for source, resume_ids in by_source.items():
+                # A shard no longer in the list is not queried, so its copies can stay
+                if source in by_id:
+                    try:
+                        self._with_retries(by_id[source].remove_resumes, resume_ids)
+                    except OSError as e:
+                        logger.warning(f"Shard {by_id[source].key} unreachable, {len(resume_ids)} moved resumes not removed: {e}")
+                        continue
+                cursor.executemany(
+                    'UPDATE resume_shards SET previous_shard = NULL WHERE resume_id = ? AND previous_shard = ?',
+                    [(resume_id, source) for resume_id in resume_ids]
+                )
+                conn.commit()
+        finally:
+            conn.close()
+        return pushed
+
+    def schedule_flush(self, db_path):
+        """Run flush_pending() on the background flusher unless one is already queued"""
+        with self._flush_lock:
+            if self._flush_queued:
+                return
+            self._flush_queued = True
+        self.flusher.submit(self._background_flush, db_path)
+
+    def _background_flush(self, db_path):
+        with self._flush_lock:
+            self._flush_queued = False
+        try:
+            self.flush_pending(db_path)
+        except Exception:
+            logger.exception("Flushing pending resumes to the shards failed")
+
+
+def create_worker_app(db_path):
+    """Build the Flask app that serves one shard"""
+    from flask import Flask, request, jsonify
+
+    store = ShardStore(db_path)
+    worker = Flask(__name__)
+
+    @worker.route('/shard/search', methods=['POST'])
+    def search():
+        data = request.json
+        matches = store.search(data['terms'], int(data.get('min_count', 1)), int(data.get('k', 5)))
+        return jsonify({'matches': matches})
+
+    @worker.route('/shard/resumes', methods=['POST'])
+    def add_resumes():
+        return jsonify({'added': store.add_resumes(request.json['rows'])})
+
+    @worker.route('/shard/resumes', methods=['DELETE'])
+    def remove_resumes():
+        return jsonify({'removed': store.remove_resumes(request.json['ids'])})
+
+    @worker.route('/shard/stats', methods=['GET'])
+    def stats():
+        return jsonify(store.stats())
+
+    return worker
+
+
+def rebalance_shards(db_path, coordinator):
+    """Assign new resumes, rebalance and record the moves; returns (assigned, moved)"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    init_shard_assignments(conn.cursor())
+    conn.commit()
+    try:
+        return coordinator.ingest(conn), coordinator.rebalance(conn)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a screening shard worker or rebalance the shards')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    worker_parser = subparsers.add_parser('worker', help='serve one shard database over HTTP')
+    worker_parser.add_argument('--db', required=True, help='path of the shard SQLite file')
+    worker_parser.add_argument('--host', default='127.0.0.1')
+    worker_parser.add_argument('--port', type=int, default=7001)
+    rebalance_parser = subparsers.add_parser('rebalance', help='spread the resumes evenly over the shards')
+    rebalance_parser.add_argument('--main-db', default='job_screening.db', help='path of the main SQLite file')
+    rebalance_parser.add_argument('--shards', required=True, help='comma-separated shard worker URLs')
+    args = parser.parse_args()
+
+    if args.command == 'worker':
+        create_worker_app(args.db).run(host=args.host, port=args.port, threaded=True)
+    elif args.command == 'rebalance':
+        logging.basicConfig(level=logging.INFO)
+        coordinator = ShardCoordinator.from_urls(args.shards.split(','))
+        assigned, moved = rebalance_shards(args.main_db, coordinator)
+        pushed = coordinator.flush_pending(args.main_db)
+        conn = sqlite3.connect(args.main_db)
+        pending = coordinator.pending_count(conn)
+        conn.close()
+        print(f"Assigned {assigned} new resumes, moved {moved}, pushed {pushed}, {pending} still pending")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Keyword extraction and filtering shared by resume and job screening.
+"""
+import re
+
+# Function to extract keywords from text
+def extract_keywords(text):
+    # Convert text to lowercase
+    text = text.lower()
+    # Remove punctuation and special characters
+    text = re.sub(r'[^\w\s]', ' ', text)
+    # Split into words
+    words = text.split()
+    # Remove duplicates and join with commas
+    return ', '.join(set(words))
+
+# Function to remove common stopwords from keywords
+def filter_keywords(keywords):
+    # Comprehensive stopwords list including common job description terms
+    stopwords = set([
+        # General stopwords
+        'and', 'or', 'the', 'a', 'an', 'in', 'to', 'with', 'for', 'on', 'by', 'of', 'at', 
+        'from', 'as', 'is', 'are', 'was', 'were', 'be', 'been', 'being', 'have', 'has', 'had',
+        'do', 'does', 'did', 'but', 'if', 'because', 'so', 'while', 'although', 'yet', 'since',
+        'about', 'above', 'below', 'over', 'under', 'again', 'further', 'then', 'once', 'here',
+        'there', 'when', 'where', 'why', 'how', 'all', 'any', 'each', 'few', 'more',
+        'most', 'other', 'some', 'such', 'no', 'not', 'only', 'own', 'same', 'than', 'too',
+        'very', 's', 't', 'can', 'will', 'just', 'don', 'should', 'now',
+        
+        # Job description specific stopwords
+        'we', 'are', 'looking', 'seeking', 'ideal', 'candidate', 'will', 'must', 'should',
+        'required', 'requirements', 'job', 'position', 'company', 'working', 'based',
+        'like', 'good', 'great', 'years',
+        'excellent', 'very', 'such', 'just', 'also', 'our', 'your', 'their', 'this', 'that',
+        
+        # Additional common words in job descriptions
+        'ability', 'work', 'team', 'skills', 'experience', 'knowledge', 'environment',
+        'development', 'design', 'implementation', 'management', 'communication',
+        'problem', 'solving', 'solutions', 'quality', 'time', 'project', 'projects',
+        'responsibilities', 'qualifications', 'education', 'degree', 'bachelor',
+        'master', 'phd', 'certification', 'proficiency', 'proficient', 'familiar',
+        'understanding', 'strong', 'minimum', 'preferred', 'plus', 'bonus', 'benefits'
+    ])
+    
+    # Ensure keywords is a list before processing
+    if isinstance(keywords, str):
+        keywords = keywords.split(', ')
+    
+    # Filter out stopwords and ensure words meet minimum length
+    filtered = []
+    for word in keywords:
+        word = word.strip().lower()
+        if (word not in stopwords and
+            len(word) > 2 and  # Avoid very short terms
+            not word.isdigit() and  # Remove pure numbers
+            not any(char.isdigit() for char in word)):  # Remove terms with numbers
+            filtered.append(word)
+    
+    return filtered